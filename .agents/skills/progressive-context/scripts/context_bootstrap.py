@@ -47,20 +47,52 @@ def add_marker(filepath: Path, watch_globs: list[str]) -> None:
     print(f"  watches: {', '.join(watch_globs)}")
 
 
+def _iter_md_files(directory):
+    """Yield paths of .md files under a directory tree.
+
+    Uses os.scandir directly: the DirEntry type check reuses the stat
+    info from the directory read instead of re-statting each path the
+    way os.walk + per-file opens would.
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_md_files(entry.path)
+            elif entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                yield entry.path
+
+
+_MARKER_TAIL_BYTES = 4096
+
+
+def _has_marker_in_tail(fpath) -> bool:
+    """Check for a freshness marker without loading the whole file.
+
+    Markers are appended by add_marker, so searching the last 4KB is
+    enough; files smaller than that are read in full.  Seeking from the
+    end may split a multi-byte character, hence the lenient decode.
+    """
+    with open(fpath, "rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        fh.seek(max(0, size - _MARKER_TAIL_BYTES))
+        tail = fh.read().decode("utf-8", "ignore")
+    return has_freshness_marker(tail)
+
+
 def scan_directory(directory: Path) -> None:
     """Find all .md files without freshness markers."""
     found = []
-    for root, _dirs, files in os.walk(directory):
-        for fname in files:
-            if not fname.endswith(".md"):
-                continue
-            fpath = Path(root) / fname
-            try:
-                content = fpath.read_text(encoding="utf-8")
-                if not has_freshness_marker(content):
-                    found.append(fpath)
-            except OSError:
-                continue
+    for fpath in _iter_md_files(directory):
+        try:
+            if not _has_marker_in_tail(fpath):
+                found.append(Path(fpath))
+        except OSError:
+            continue
 
     if not found:
         print("All .md files already have freshness markers (or none found).")
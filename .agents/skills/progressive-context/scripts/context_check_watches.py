@@ -7,64 +7,99 @@ fast and silent for git hooks — only prints warnings when matches are found.
 
 Usage:
     python3 context_check_watches.py <file1> [file2] ...
+    python3 context_check_watches.py --rev <rev>
+
+With --rev the files touched by the given commit are read via a single
+git diff-tree call, so hooks invoke one python3 process instead of a
+diff-tree | xargs pipeline.
 
 Exit code is always 0 (warnings are informational, never block commits).
 Requires: git in PATH.
 """
 
+import subprocess
 import sys
-from fnmatch import fnmatch
 
 from context_lib import (
     FRESHNESS_PATTERN,
-    find_context_files,
+    compile_watch_globs,
     find_git_root,
+    iter_context_files,
     parse_watches,
 )
 
 
 def find_tracked_context_files(git_root):
-    """Find all context files with freshness markers, return (path, watches) pairs."""
+    """Find all context files with freshness markers.
+
+    Returns (tracked, master): tracked is (path, matcher) pairs, with
+    each matcher the file's compiled watch-glob matcher; master matches
+    the union of every watch glob across all context files and serves
+    as a cheap first-pass filter, so modified files that nobody watches
+    (the common commit) never reach the per-file matchers.
+    """
     results = []
-    for fpath in find_context_files(git_root):
-        try:
-            content = fpath.read_text(encoding="utf-8")
-        except OSError:
+    all_globs = {}
+    for fpath, content, _ in iter_context_files(git_root):
+        if content is None:
             continue
         match = FRESHNESS_PATTERN.search(content)
         if match:
             watches = parse_watches(match.group(1))
             if watches:
-                results.append((fpath, watches))
-    return results
+                results.append((fpath, compile_watch_globs(watches)))
+                all_globs.update(dict.fromkeys(watches))
+    master = compile_watch_globs(list(all_globs)) if all_globs else None
+    return results, master
+
+
+def list_commit_files(git_root, rev):
+    """List files touched by a commit, NUL-delimited to survive any filename."""
+    try:
+        result = subprocess.run(
+            ["git", "diff-tree", "--no-commit-id", "--name-only", "-r",
+             rev, "-z"],
+            capture_output=True, text=True, check=False,
+            cwd=git_root,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+    if result.returncode != 0:
+        return []
+    return [f for f in result.stdout.split("\0") if f]
 
 
 def main():
     if len(sys.argv) < 2:
         sys.exit(0)
 
-    modified_files = sys.argv[1:]
     git_root = find_git_root(exit_on_error=False)
-    tracked = find_tracked_context_files(git_root)
+    if sys.argv[1] == "--rev":
+        rev = sys.argv[2] if len(sys.argv) > 2 else "HEAD"
+        modified_files = list_commit_files(git_root, rev)
+    else:
+        modified_files = sys.argv[1:]
+    if not modified_files:
+        sys.exit(0)
+    tracked, master = find_tracked_context_files(git_root)
 
     if not tracked:
         sys.exit(0)
 
-    for context_file, watches in tracked:
-        matched = False
-        for modified in modified_files:
-            for glob_pattern in watches:
-                if fnmatch(modified, glob_pattern):
-                    try:
-                        rel_context = context_file.relative_to(git_root)
-                    except ValueError:
-                        rel_context = context_file
-                    print(f"[context] Warning: {rel_context} may be stale "
-                          f"(watched file changed: {modified})")
-                    matched = True
-                    break
-            if matched:
-                break
+    modified_files = [m for m in modified_files if master.match(m)]
+    if not modified_files:
+        sys.exit(0)
+
+    for context_file, matcher in tracked:
+        hit = next((m for m in modified_files if matcher.match(m)), None)
+        if hit is None:
+            continue
+        try:
+            rel_context = context_file.relative_to(git_root)
+        except ValueError:
+            rel_context = context_file
+        print(f"[context] Warning: {rel_context} may be stale "
+              f"(watched file changed: {hit})")
 
     sys.exit(0)
 
@@ -18,11 +18,22 @@ Requires: git in PATH (for --auto mode).
 import re
 import subprocess
 import sys
-from fnmatch import fnmatch
+from fnmatch import translate as glob_translate
 from pathlib import Path
 
 from context_lib import find_git_root
 
+_CONTEXT_INDEX_RE = re.compile(
+    r"##\s+Context Index\s*\n(.*?)(?=\n##\s|\Z)",
+    re.DOTALL,
+)
+
+# Matches the first two cells of a markdown table row in one shot.
+_INDEX_ROW_RE = re.compile(
+    r"^\s*\|\s*([^|]+?)\s*\|\s*([^|]+?)\s*\|",
+    re.MULTILINE,
+)
+
 
 def parse_context_index(git_root: Path) -> list[tuple[str, str]]:
     """Parse the Context Index table from CLAUDE.md.
@@ -38,49 +49,40 @@ def parse_context_index(git_root: Path) -> list[tuple[str, str]]:
     except OSError:
         return []
 
-    section_match = re.search(
-        r"##\s+Context Index\s*\n(.*?)(?=\n##\s|\Z)",
-        content,
-        re.DOTALL,
-    )
+    section_match = _CONTEXT_INDEX_RE.search(content)
     if not section_match:
         return []
 
     section = section_match.group(1)
 
     mappings = []
-    for line in section.splitlines():
-        line = line.strip()
-        if not line.startswith("|"):
-            continue
-        cells = [c.strip() for c in line.split("|")]
-        cells = [c for c in cells if c]
-        if len(cells) < 2:
-            continue
-        glob_cell = cells[0]
-        file_cell = cells[1]
-        if glob_cell.lower() in ("directory", "glob", "---", "----") or "-" * 3 in glob_cell:
+    for row in _INDEX_ROW_RE.finditer(section):
+        glob_cell = row.group(1)
+        if glob_cell.lower() in ("directory", "glob") or "-" * 3 in glob_cell:
             continue
-        context_file = file_cell.strip("`")
+        context_file = row.group(2).strip("`")
         if not context_file:
             continue
-        raw_globs = [g.strip().strip("`") for g in glob_cell.split(",")]
-        for glob_pattern in raw_globs:
-            glob_pattern = glob_pattern.strip()
+        for glob_pattern in glob_cell.split(","):
+            glob_pattern = glob_pattern.strip().strip("`")
             if glob_pattern:
                 mappings.append((glob_pattern, context_file))
 
     return mappings
 
 
+def compile_mappings(
+        mappings: list[tuple[str, str]]) -> list[tuple[re.Pattern, str]]:
+    """Compile each mapping glob to a regex for repeated matching."""
+    return [(re.compile(glob_translate(glob_pattern)), context_file)
+            for glob_pattern, context_file in mappings]
+
+
 def find_context_for_file(filepath: str,
-                          mappings: list[tuple[str, str]]) -> list[str]:
+                          compiled: list[tuple[re.Pattern, str]]) -> list[str]:
     """Find context files that match a given source file path."""
-    matches = []
-    for glob_pattern, context_file in mappings:
-        if fnmatch(filepath, glob_pattern):
-            matches.append(context_file)
-    return matches
+    return [context_file for matcher, context_file in compiled
+            if matcher.match(filepath)]
 
 
 def get_modified_files(git_root: Path) -> list[str]:
@@ -127,7 +129,7 @@ def output_context_file(git_root: Path, context_path: str) -> bool:
 def mode_lookup(filepath: str, git_root: Path,
                 mappings: list[tuple[str, str]]) -> None:
     """Look up and output context for a single file."""
-    matches = find_context_for_file(filepath, mappings)
+    matches = find_context_for_file(filepath, compile_mappings(mappings))
     if not matches:
         print(f"No context mapping found for: {filepath}", file=sys.stderr)
         sys.exit(0)
@@ -143,13 +145,12 @@ def mode_auto(git_root: Path, mappings: list[tuple[str, str]]) -> None:
         print("No modified or staged files detected.", file=sys.stderr)
         sys.exit(0)
 
-    seen = set()
-    context_files = []
-    for filepath in modified:
-        for context_file in find_context_for_file(filepath, mappings):
-            if context_file not in seen:
-                seen.add(context_file)
-                context_files.append(context_file)
+    compiled = compile_mappings(mappings)
+    # dict.fromkeys keeps first-seen order while dedeuping in one pass
+    context_files = list(dict.fromkeys(
+        context_file
+        for filepath in modified
+        for context_file in find_context_for_file(filepath, compiled)))
 
     if not context_files:
         print("No context mappings match the modified files.", file=sys.stderr)
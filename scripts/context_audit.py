@@ -12,39 +12,76 @@ Exit code is always 0 (report is informational).
 Requires: git in PATH.
 """
 
-import subprocess
 import sys
-from fnmatch import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from context_lib import (
+    _list_tracked_files,
+    compile_watch_globs,
     compute_hash,
-    find_context_files,
     find_git_root,
+    iter_context_files,
+    list_changed_files,
     parse_freshness_marker,
 )
 
 
+# Serializes the first (and only) HEAD~5..HEAD diff across worker
+# threads; list_changed_files caches it, so later calls are lookups.
+_changed_files_lock = threading.Lock()
+
+
 def get_changed_files(git_root, watch_globs):
     """Get list of watched files that have changed recently (last 5 commits)."""
-    try:
-        result = subprocess.run(
-            ["git", "diff", "--name-only", "HEAD~5..HEAD", "--"],
-            capture_output=True, text=True, check=False,
-            cwd=git_root,
-        )
-        if result.returncode != 0:
-            return []
-        changed = result.stdout.strip().splitlines()
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return []
-
-    matched = []
-    for f in changed:
-        for glob_pattern in watch_globs:
-            if fnmatch(f, glob_pattern):
-                matched.append(f)
-                break
-    return matched
+    matcher = compile_watch_globs(watch_globs)
+    with _changed_files_lock:
+        changed = list_changed_files(git_root)
+    return [f for f in changed if matcher.match(f)]
+
+
+def audit_file(git_root, filepath, content, error=None):
+    """Audit one context file. Returns (status, report lines).
+
+    Safe to run from worker threads: only reads git state via
+    compute_hash / get_changed_files.
+    """
+    rel_path = filepath.relative_to(git_root)
+
+    if content is None:
+        return "error", [f"ERROR  {rel_path}",
+                         f"       could not read: {error}"]
+
+    marker = parse_freshness_marker(content)
+
+    if marker is None:
+        return "missing", [f"NONE   {rel_path}",
+                           "       no freshness marker found",
+                           ""]
+
+    stored_hash = marker["watches_hash"]
+    current_hash = compute_hash(git_root, marker["watches"])
+    last_verified = marker.get("last_verified", "unknown")
+
+    if stored_hash != current_hash:
+        lines = [
+            f"STALE  {rel_path}",
+            f"       watches_hash: {stored_hash} -> {current_hash} (changed)",
+            f"       last_verified: {last_verified}",
+        ]
+        changed = get_changed_files(git_root, marker["watches"])
+        if changed:
+            lines.append(f"       changed files:")
+            lines.extend(f"         - {cf}" for cf in changed[:10])
+            if len(changed) > 10:
+                lines.append(f"         ... and {len(changed) - 10} more")
+        lines.append("")
+        return "stale", lines
+
+    return "ok", [f"OK     {rel_path}",
+                  f"       watches_hash: {stored_hash} (unchanged)",
+                  f"       last_verified: {last_verified}",
+                  ""]
 
 
 def main():
@@ -56,63 +93,36 @@ def main():
             root_arg = args[idx + 1]
 
     git_root = find_git_root(root_arg or ".")
-    context_files = find_context_files(git_root)
+    context_files = iter_context_files(git_root)
 
     if not context_files:
         print("No context files found matching known patterns.")
         return
 
-    stale_count = 0
-    ok_count = 0
-    missing_count = 0
-
     print("CONTEXT FRESHNESS REPORT")
     print("========================")
 
-    for filepath in context_files:
-        rel_path = filepath.relative_to(git_root)
-
-        try:
-            content = filepath.read_text(encoding="utf-8")
-        except OSError as e:
-            print(f"ERROR  {rel_path}")
-            print(f"       could not read: {e}")
-            continue
-
-        marker = parse_freshness_marker(content)
-
-        if marker is None:
-            missing_count += 1
-            print(f"NONE   {rel_path}")
-            print("       no freshness marker found")
-            print()
-            continue
-
-        stored_hash = marker["watches_hash"]
-        current_hash = compute_hash(git_root, marker["watches"])
-        last_verified = marker.get("last_verified", "unknown")
-
-        if stored_hash != current_hash:
-            stale_count += 1
-            print(f"STALE  {rel_path}")
-            print(f"       watches_hash: {stored_hash} -> {current_hash} (changed)")
-            print(f"       last_verified: {last_verified}")
-            changed = get_changed_files(git_root, marker["watches"])
-            if changed:
-                print(f"       changed files:")
-                for cf in changed[:10]:
-                    print(f"         - {cf}")
-                if len(changed) > 10:
-                    print(f"         ... and {len(changed) - 10} more")
-        else:
-            ok_count += 1
-            print(f"OK     {rel_path}")
-            print(f"       watches_hash: {stored_hash} (unchanged)")
-            print(f"       last_verified: {last_verified}")
-
-        print()
-
-    print(f"Summary: {stale_count} stale, {ok_count} current, {missing_count} missing markers")
+    # Warm the tracked-file cache before fanning out: lru_cache does not
+    # serialize concurrent misses, so a cold pool would fork git ls-files
+    # once per worker and race on the on-disk pickle cache.
+    _list_tracked_files(git_root)
+
+    # Context files are independent, so audit them concurrently; the
+    # subprocess-bound work in each release the GIL. Results are printed
+    # in original order to keep output deterministic.
+    with ThreadPoolExecutor(max_workers=min(8, len(context_files))) as pool:
+        results = list(pool.map(
+            lambda entry: audit_file(git_root, *entry),
+            context_files))
+
+    counts = {"error": 0, "missing": 0, "stale": 0, "ok": 0}
+    for status, lines in results:
+        counts[status] += 1
+        for line in lines:
+            print(line)
+
+    print(f"Summary: {counts['stale']} stale, {counts['ok']} current, "
+          f"{counts['missing']} missing markers")
 
 
 if __name__ == "__main__":
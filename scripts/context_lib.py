@@ -2,17 +2,32 @@
 """Shared utilities for context freshness tracking scripts.
 
 All context_* scripts import from this module to avoid duplication.
-Python 3 stdlib-only — no external dependencies.
+Python 3 stdlib-only — no required external dependencies.  If pygit2 is
+installed it is used for in-process git access, skipping subprocess
+spawns; everything falls back to git-in-PATH otherwise.
 """
 
-import glob as globmod
+import functools
+import hashlib
+import os
+import pickle
 import re
 import subprocess
 import sys
 from datetime import date
-from fnmatch import fnmatch
+from fnmatch import translate as glob_translate
 from pathlib import Path
 
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 CONTEXT_GLOBS = [
     ".cursor/rules/*.md",
     "docs/context/*.md",
@@ -30,9 +45,40 @@ FRESHNESS_PATTERN_GROUPS = re.compile(
     re.DOTALL,
 )
 
+# Precompiled per-field patterns for the marker block.  Searched
+# independently: build_marker writes the fields in a fixed order, but
+# the format allows any order, so a single ordered pass would silently
+# drop fields from hand-edited markers.
+_MARKER_HASH_RE = re.compile(r"watches_hash:\s*(\S+)")
+_MARKER_DATE_RE = re.compile(r"last_verified:\s*(\S+)")
+_MARKER_WATCHES_RE = re.compile(r"watches:\s*\n((?:\s*-\s+.+\n?)*)")
+
+_WATCH_ITEM_RE = re.compile(r"-\s+(.+)")
 
+
+@functools.lru_cache(maxsize=None)
 def find_git_root(start: str = ".", *, exit_on_error: bool = True) -> Path:
-    """Find the git repository root from a starting directory."""
+    """Find the git repository root from a starting directory.
+
+    Cached per start directory, so repeated lookups within one process
+    cost nothing.  Environment variables exported by git hooks and many
+    CI setups are consulted first to skip the subprocess entirely.
+    """
+    env_top = os.environ.get("GIT_TOP") or os.environ.get("GIT_WORK_TREE")
+    if env_top:
+        return Path(env_top)
+    env_git_dir = os.environ.get("GIT_DIR")
+    if env_git_dir and env_git_dir.endswith(".git"):
+        return Path(env_git_dir).parent
+    if pygit2 is not None:
+        gitdir = pygit2.discover_repository(start)
+        workdir = pygit2.Repository(gitdir).workdir if gitdir else None
+        if workdir:
+            return Path(workdir)
+        if exit_on_error:
+            print("Error: not inside a git repository", file=sys.stderr)
+            sys.exit(1)
+        return Path(".")
     try:
         result = subprocess.run(
             ["git", "rev-parse", "--show-toplevel"],
@@ -48,59 +94,259 @@ def find_git_root(start: str = ".", *, exit_on_error: bool = True) -> Path:
 
 
 def find_context_files(git_root: Path) -> list[Path]:
-    """Find all context files matching CONTEXT_GLOBS."""
+    """Find all context files matching CONTEXT_GLOBS.
+
+    Every pattern in CONTEXT_GLOBS has a static directory prefix with
+    glob characters only in the final component, so each one is served
+    by a single scandir of that directory (or one stat for literal root
+    files) instead of a recursive glob walk.
+    """
     files = []
     for pattern in CONTEXT_GLOBS:
-        matches = globmod.glob(str(git_root / pattern))
-        files.extend(Path(m) for m in matches)
-    return sorted(set(files))
+        prefix, _, leaf = pattern.rpartition("/")
+        if not any(ch in leaf for ch in "*?["):
+            path = git_root / pattern
+            if path.is_file():
+                files.append(path)
+            continue
+        leaf_re = re.compile(glob_translate(leaf))
+        try:
+            with os.scandir(git_root / prefix) as it:
+                files.extend(Path(entry.path) for entry in it
+                             if leaf_re.match(entry.name) and entry.is_file())
+        except OSError:
+            continue
+    # dict.fromkeys dedupes in one pass without hashing into a set first
+    return sorted(dict.fromkeys(files))
+
+
+def iter_context_files(git_root: Path) -> list[tuple[Path, str | None, str | None]]:
+    """Find all context files and read their contents in one pass.
+
+    Returns sorted (path, content, error) triples; content is None and
+    error carries the OS error text for files that could not be read.
+    Fusing discovery with reading saves callers a second open/read
+    round-trip per file.
+    """
+    entries = []
+    for path in find_context_files(git_root):
+        try:
+            entries.append((path, path.read_text(encoding="utf-8"), None))
+        except OSError as e:
+            entries.append((path, None, str(e)))
+    return entries
+
+
+_TRACKED_CACHE_NAME = "context-cache.pkl"
+
+
+def _git_dir(git_root: Path) -> Path | None:
+    """Resolve the .git directory, following worktree/submodule redirects."""
+    dot_git = git_root / ".git"
+    if dot_git.is_dir():
+        return dot_git
+    try:
+        text = dot_git.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    if text.startswith("gitdir:"):
+        return Path(os.path.normpath(git_root / text.partition(":")[2].strip()))
+    return None
+
+
+def _tracked_cache_key(git_dir: Path) -> tuple | None:
+    """Build a cache validity key: HEAD ref plus index mtime/size."""
+    try:
+        head = (git_dir / "HEAD").read_bytes()
+        st = os.stat(git_dir / "index")
+    except OSError:
+        return None
+    return (head, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=None)
+def _list_tracked_files(git_root: Path) -> tuple[tuple[str, str], ...] | None:
+    """List git-tracked files as (path, blob_hash) pairs.
+
+    Cached at two levels: lru_cache per git_root within a process, and a
+    pickle under the git dir across processes (hook pipelines run several
+    of these scripts back to back on the same commit).  The on-disk cache
+    is keyed by HEAD plus the index's mtime/size, so any commit, checkout,
+    or staging change invalidates it.  Returns None if git fails.
+    """
+    if pygit2 is not None:
+        try:
+            repo = pygit2.Repository(str(git_root))
+            return tuple((entry.path, str(entry.id)) for entry in repo.index)
+        except pygit2.GitError:
+            return None
+
+    git_dir = _git_dir(git_root)
+    cache_key = _tracked_cache_key(git_dir) if git_dir is not None else None
+    if cache_key is not None:
+        try:
+            with open(git_dir / _TRACKED_CACHE_NAME, "rb") as fh:
+                stored_key, stored_entries = pickle.load(fh)
+            if stored_key == cache_key:
+                return stored_entries
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            pass
+
+    # Stream NUL-delimited output in chunks rather than buffering and
+    # decoding one giant string; -z also handles unusual filenames that
+    # git would otherwise quote.  Record format: "mode sha stage\tpath\0".
+    try:
+        proc = subprocess.Popen(
+            ["git", "ls-files", "-s", "-z"],
+            stdout=subprocess.PIPE, cwd=git_root,
+        )
+    except FileNotFoundError:
+        return None
+
+    entries = []
+    tail = b""
+    while True:
+        chunk = proc.stdout.read(65536)
+        if not chunk:
+            break
+        records = (tail + chunk).split(b"\0")
+        tail = records.pop()
+        for record in records:
+            meta, _, path = record.partition(b"\t")
+            if not path:
+                continue
+            entries.append((path.decode("utf-8"), meta.split()[1].decode("ascii")))
+
+    if proc.wait() != 0:
+        return None
+
+    tracked = tuple(entries)
+    if cache_key is not None:
+        try:
+            with open(git_dir / _TRACKED_CACHE_NAME, "wb") as fh:
+                pickle.dump((cache_key, tracked), fh,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+    return tracked
+
+
+class _HyperscanMatcher:
+    """Adapter exposing re.Pattern-style ``match`` over a Hyperscan database.
+
+    Hyperscan compiles all patterns into one JIT'd DFA, so matching stays
+    O(path length) regardless of pattern count — worthwhile for monorepos
+    with many watch globs.
+    """
+
+    def __init__(self, watch_globs: list[str]):
+        self._db = hyperscan.Database()
+        # fnmatch.translate anchors with \Z and match() anchors the start;
+        # Hyperscan needs those expressed in the pattern itself.
+        expressions = [
+            ("^" + glob_translate(g).replace(r"\Z", "$")).encode()
+            for g in watch_globs
+        ]
+        self._db.compile(
+            expressions=expressions,
+            flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions),
+        )
+
+    def match(self, path: str) -> bool:
+        hit = False
+
+        def on_match(_pat_id, _start, _end, _flags, _ctx):
+            nonlocal hit
+            hit = True
+
+        self._db.scan(path.encode(), match_event_handler=on_match)
+        return hit
+
+
+def compile_watch_globs(watch_globs: list[str]):
+    """Compile watch globs into a single multi-pattern matcher.
+
+    Matching each file against one pre-compiled matcher replaces the
+    O(files x patterns) per-file fnmatch loop with a single C-level match
+    per file.  Uses Hyperscan when the optional module is installed
+    (falling back if a pattern is outside its PCRE subset), otherwise a
+    union regex built from fnmatch.translate.
+    """
+    if not watch_globs:
+        # An empty union would compile to re.compile(""), which matches
+        # every path; no globs must match nothing.
+        return re.compile(r"(?!)")
+    if hyperscan is not None:
+        try:
+            return _HyperscanMatcher(watch_globs)
+        except hyperscan.HyperscanError:
+            pass
+    return re.compile("|".join(glob_translate(g) for g in watch_globs))
 
 
 def compute_hash(git_root: Path, watch_globs: list[str]) -> str:
     """Compute a content-aware hash from git-tracked files matching watch_globs.
 
     Uses ``git ls-files -s`` to obtain per-file blob hashes (which change
-    when file content changes), filters by watch_globs via fnmatch, then
-    hashes the sorted "blob_hash path" pairs.  Returns the first 7 hex chars.
+    when file content changes), filters by watch_globs, then hashes the
+    sorted "blob_hash path" pairs.  Returns the first 7 hex chars.
+
+    The index already carries every blob SHA, so content changes are
+    caught without reading file contents or querying the object store
+    per file (no ``git cat-file --batch`` round-trips needed).
 
     Note: fnmatch does not treat '/' specially, so both '*' and '**' match
     across directory boundaries.  We standardize on '**' by convention.
     """
-    try:
-        result = subprocess.run(
-            ["git", "ls-files", "-s"],
-            capture_output=True, text=True, check=True,
-            cwd=git_root,
-        )
-    except subprocess.CalledProcessError:
+    tracked = _list_tracked_files(git_root)
+    if tracked is None:
         return "ERROR"
 
-    matched = []
-    for line in result.stdout.strip().splitlines():
-        parts = line.split("\t", 1)
-        if len(parts) != 2:
-            continue
-        filepath = parts[1]
-        blob_hash = parts[0].split()[1]
-        for glob_pattern in watch_globs:
-            if fnmatch(filepath, glob_pattern):
-                matched.append((filepath, blob_hash))
-                break
+    matcher = compile_watch_globs(watch_globs)
+    matched = [(filepath, blob_hash) for filepath, blob_hash in tracked
+               if matcher.match(filepath)]
 
     if not matched:
         return "0000000"
 
     matched.sort(key=lambda x: x[0])
     hash_input = "\n".join(f"{h} {p}" for p, h in matched) + "\n"
+    # Git blob hash computed in-process (identical to `git hash-object
+    # --stdin`): SHA-1 over "blob <len>\0<data>".  Saves a subprocess
+    # spawn per marker.
+    payload = hash_input.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0%s" % (len(payload), payload)).hexdigest()[:7]
+
+
+@functools.lru_cache(maxsize=None)
+def list_changed_files(git_root: Path,
+                       rev_range: str = "HEAD~5..HEAD") -> tuple[str, ...]:
+    """List files changed in a revision range (default: last 5 commits).
+
+    Cached per (git_root, rev_range): an audit reporting several stale
+    markers diffs the same range once and filters it per marker.
+    Returns () when the range cannot be resolved (e.g. shallow history).
+    """
+    if pygit2 is not None:
+        try:
+            repo = pygit2.Repository(str(git_root))
+            old_rev, _, new_rev = rev_range.partition("..")
+            diff = repo.diff(repo.revparse_single(old_rev),
+                             repo.revparse_single(new_rev or "HEAD"))
+            return tuple(delta.new_file.path for delta in diff.deltas)
+        except (pygit2.GitError, KeyError):
+            return ()
     try:
         result = subprocess.run(
-            ["git", "hash-object", "--stdin"],
-            input=hash_input, capture_output=True, text=True, check=True,
+            ["git", "diff", "--name-only", rev_range, "--"],
+            capture_output=True, text=True, check=False,
             cwd=git_root,
         )
-        return result.stdout.strip()[:7]
-    except subprocess.CalledProcessError:
-        return "ERROR"
+        if result.returncode != 0:
+            return ()
+        return tuple(result.stdout.strip().splitlines())
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return ()
 
 
 def parse_freshness_marker(content: str) -> dict | None:
@@ -114,19 +360,19 @@ def parse_freshness_marker(content: str) -> dict | None:
         return None
 
     block = match.group(1)
-    data = {}
-
-    hash_match = re.search(r"watches_hash:\s*(\S+)", block)
-    if hash_match:
-        data["watches_hash"] = hash_match.group(1)
+    hash_match = _MARKER_HASH_RE.search(block)
+    if not hash_match:
+        return None
 
-    date_match = re.search(r"last_verified:\s*(\S+)", block)
+    data = {"watches_hash": hash_match.group(1)}
+    date_match = _MARKER_DATE_RE.search(block)
     if date_match:
         data["last_verified"] = date_match.group(1)
+    watches_match = _MARKER_WATCHES_RE.search(block)
+    data["watches"] = [w.strip() for w in _WATCH_ITEM_RE.findall(
+        watches_match.group(1) if watches_match else "")]
 
-    data["watches"] = parse_watches(block)
-
-    return data if data.get("watches_hash") else None
+    return data
 
 
 def parse_watches(block: str) -> list[str]:
@@ -134,15 +380,16 @@ def parse_watches(block: str) -> list[str]:
     watches = []
     in_watches = False
     for line in block.splitlines():
-        stripped = line.strip()
-        if stripped.startswith("watches:"):
+        s = line.lstrip()
+        if s.startswith("watches:"):
             in_watches = True
             continue
-        if in_watches:
-            if stripped.startswith("- "):
-                watches.append(stripped[2:].strip())
-            elif stripped and not stripped.startswith("-"):
-                break
+        if not in_watches:
+            continue
+        if s.startswith("- "):
+            watches.append(s[2:].strip())
+        elif s and s[0] != "-":
+            break
     return watches
 
 
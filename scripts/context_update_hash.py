@@ -22,6 +22,9 @@ from context_lib import (
     parse_watches,
 )
 
+_HASH_FIELD_RE = re.compile(r"watches_hash:\s*\S+")
+_DATE_FIELD_RE = re.compile(r"last_verified:\s*\S+")
+
 
 def main():
     if len(sys.argv) < 2:
@@ -52,16 +55,8 @@ def main():
     new_hash = compute_hash(git_root, watches)
     today = date.today().isoformat()
 
-    new_block = re.sub(
-        r"watches_hash:\s*\S+",
-        f"watches_hash: {new_hash}",
-        block,
-    )
-    new_block = re.sub(
-        r"last_verified:\s*\S+",
-        f"last_verified: {today}",
-        new_block,
-    )
+    new_block = _HASH_FIELD_RE.sub(f"watches_hash: {new_hash}", block)
+    new_block = _DATE_FIELD_RE.sub(f"last_verified: {today}", new_block)
 
     new_content = content[:match.start(2)] + new_block + content[match.end(2):]
     filepath.write_text(new_content, encoding="utf-8")
@@ -17,19 +17,28 @@ Usage:
     python3 install_hooks.py --uninstall [--root <git-root>]
 """
 
+import argparse
 import json
 import os
+import re
 import stat
 import subprocess
 import sys
 from pathlib import Path
 
+try:
+    # Round-trip loader: edits .pre-commit-config.yaml structurally while
+    # preserving the user's comments and formatting.
+    from ruamel.yaml import YAML
+except ImportError:
+    YAML = None
+
 _POST_COMMIT_HOOK = """\
 #!/bin/sh
 # Context freshness check — warns if committed files affect context
 SCRIPTS_DIR="$(git rev-parse --show-toplevel)/scripts"
 if command -v python3 >/dev/null 2>&1 && [ -f "$SCRIPTS_DIR/context_check_watches.py" ]; then
-  git diff-tree --no-commit-id --name-only -r HEAD -z | xargs -0 python3 "$SCRIPTS_DIR/context_check_watches.py" 2>/dev/null
+  python3 "$SCRIPTS_DIR/context_check_watches.py" --rev HEAD 2>/dev/null
 fi
 """
 
@@ -42,9 +51,11 @@ if command -v python3 >/dev/null 2>&1 && [ -f "$SCRIPTS_DIR/context_audit.py" ];
 fi
 """
 
+# Encoded once at import; write_hook works on bytes end to end, so the
+# same object serves every destination without per-write re-encoding.
 HOOK_CONTENT = {
-    "post-commit": _POST_COMMIT_HOOK,
-    "post-merge": _POST_MERGE_HOOK,
+    "post-commit": _POST_COMMIT_HOOK.encode("utf-8"),
+    "post-merge": _POST_MERGE_HOOK.encode("utf-8"),
 }
 
 
@@ -62,62 +73,148 @@ def find_git_root(start: str = ".") -> Path:
         sys.exit(1)
 
 
-def make_executable(path: Path) -> None:
-    """Make a file executable (chmod +x)."""
-    st = os.stat(path)
+def _read_local_git_config(git_root: Path) -> dict[str, str]:
+    """Read the repo-local git config in one invocation.
+
+    Returns a {key: value} dict (keys are lowercased by git), replacing
+    one `git config <key>` fork per key queried.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "config", "--list", "--local", "-z"],
+            capture_output=True, text=True, check=True,
+            cwd=os.fspath(git_root),
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+    cfg = {}
+    for record in result.stdout.split("\0"):
+        if record:
+            key, _, value = record.partition("\n")
+            cfg[key] = value
+    return cfg
+
+
+def _snapshot_dir(path: Path) -> dict | None:
+    """Snapshot a directory as a name -> DirEntry map in one readdir.
+
+    Returns None when the directory cannot be read.  DirEntry objects
+    carry cached stat info, so callers holding a snapshot skip the
+    per-file existence and mode stats.
+    """
+    try:
+        with os.scandir(path) as it:
+            return {entry.name: entry for entry in it}
+    except OSError:
+        return None
+
+
+def make_executable(path, st: os.stat_result | None = None) -> None:
+    """Make a file executable (chmod +x). Accepts any path-like."""
+    if st is None:
+        st = os.stat(path)
     os.chmod(path, st.st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
 
 
-def write_hook(hook_path: Path, content: str, hook_name: str) -> bool:
-    """Write a hook file if it doesn't exist. Returns True if written."""
-    if hook_path.exists():
-        existing = hook_path.read_text(encoding="utf-8")
-        if "context_check_watches" in existing or "context_audit" in existing:
-            print(f"  Skipped {hook_name}: already contains context hooks")
-            return False
-        # Append to existing hook
-        print(f"  Appended to existing {hook_name}")
-        with open(hook_path, "a", encoding="utf-8") as f:
-            f.write(f"\n# --- progressive-context hooks ---\n")
-            # Extract just the body (skip shebang if appending)
-            lines = content.splitlines()
+def write_hook(hook_path: Path, content: bytes, hook_name: str,
+               snapshot: dict | None = None) -> bool:
+    """Write a hook file if it doesn't exist. Returns True if written.
+
+    snapshot, when given, must cover hook_path's directory (see
+    _snapshot_dir); existence and mode checks then reuse its cached
+    stat info instead of issuing fresh syscalls.
+    """
+    hp = os.fspath(hook_path)
+    entry = snapshot.get(hook_path.name) if snapshot is not None else None
+    exists = entry is not None if snapshot is not None else hook_path.exists()
+    if exists:
+        # One O_RDWR|O_APPEND open serves both the signature check and
+        # the append, instead of a read-open followed by an append-open.
+        fd = os.open(hp, os.O_RDWR | os.O_APPEND)
+        with os.fdopen(fd, "a+b") as f:
+            f.seek(0)
+            existing = f.read()
+            if b"context_check_watches" in existing or b"context_audit" in existing:
+                print(f"  Skipped {hook_name}: already contains context hooks")
+                return False
+            # Append to existing hook
+            print(f"  Appended to existing {hook_name}")
+            f.write(b"\n# --- progressive-context hooks ---\n")
+            # Extract just the body: step over the shebang and leading
+            # comment lines with find() instead of splitting the whole
+            # template into line objects.
             body_start = 0
-            for i, line in enumerate(lines):
-                if line.startswith("#!"):
-                    body_start = i + 1
-                    continue
-                if line.startswith("#") and i == body_start:
-                    body_start = i + 1
-                    continue
-                break
-            f.write("\n".join(lines[body_start:]) + "\n")
-        make_executable(hook_path)
+            while content.startswith(b"#", body_start):
+                nl = content.find(b"\n", body_start)
+                if nl == -1:
+                    body_start = len(content)
+                    break
+                body_start = nl + 1
+            f.write(content[body_start:])
+        make_executable(hp, entry.stat() if entry is not None else None)
         return True
 
     hook_path.parent.mkdir(parents=True, exist_ok=True)
-    hook_path.write_text(content, encoding="utf-8")
-    make_executable(hook_path)
+    # O_EXCL makes the existence check and the create one atomic step,
+    # and baking the mode into open drops the stat+chmod pair.
+    try:
+        fd = os.open(hp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o755)
+    except FileExistsError:
+        print(f"  Skipped {hook_name}: already exists")
+        return False
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
     print(f"  Created {hook_name}")
     return True
 
 
-def detect_husky(git_root: Path) -> bool:
+# The handful of top-level names the hook-system detectors probe for.
+_DETECT_NAMES = frozenset(
+    {".husky", ".pre-commit-config.yaml", ".githooks", "package.json"})
+
+
+def _top_level_snapshot(git_root: Path) -> dict:
+    """One readdir of the repo root covering every detector's probe.
+
+    Collapses the detectors' separate is_dir()/exists() stats into a
+    single scandir; main takes the snapshot once and hands it to each
+    detector.
+    """
+    try:
+        with os.scandir(git_root) as it:
+            return {e.name: e for e in it if e.name in _DETECT_NAMES}
+    except OSError:
+        return {}
+
+
+def detect_husky(git_root: Path, snapshot: dict | None = None) -> bool:
     """Check if project uses Husky."""
-    husky_dir = git_root / ".husky"
-    pkg_json = git_root / "package.json"
-    if not husky_dir.is_dir() or not pkg_json.exists():
+    if snapshot is None:
+        snapshot = _top_level_snapshot(git_root)
+    husky = snapshot.get(".husky")
+    if husky is None or not husky.is_dir():
         return False
     try:
-        pkg = json.loads(pkg_json.read_text(encoding="utf-8"))
+        raw = (git_root / "package.json").read_bytes()
+    except OSError:
+        return False
+    # Substring pre-filter: only parse the (potentially large) JSON when
+    # both tokens appear at all.
+    if b'"prepare"' not in raw or b"husky" not in raw:
+        return False
+    try:
+        pkg = json.loads(raw)
         scripts = pkg.get("scripts", {})
         return "husky" in scripts.get("prepare", "")
-    except (json.JSONDecodeError, OSError):
+    except json.JSONDecodeError:
         return False
 
 
-def detect_precommit(git_root: Path) -> bool:
+def detect_precommit(git_root: Path, snapshot: dict | None = None) -> bool:
     """Check if project uses pre-commit framework."""
-    return (git_root / ".pre-commit-config.yaml").exists()
+    if snapshot is None:
+        snapshot = _top_level_snapshot(git_root)
+    return ".pre-commit-config.yaml" in snapshot
 
 
 def install_husky(git_root: Path) -> None:
@@ -138,13 +235,20 @@ def install_precommit(git_root: Path) -> None:
     """
     print("Detected: pre-commit")
     config_path = git_root / ".pre-commit-config.yaml"
-    content = config_path.read_text(encoding="utf-8")
+    raw = config_path.read_bytes()
 
-    if "context_check_watches" in content:
+    # Signature check on the raw bytes: the reinstall case bails out
+    # before paying for a UTF-8 decode of the config.
+    if b"context_check_watches" in raw:
         print("  Skipped: context hooks already in .pre-commit-config.yaml")
         return
+    content = raw.decode("utf-8")
+
+    if YAML is not None:
+        _install_precommit_structured(config_path, content)
+        return
 
-    scripts_dir = Path(__file__).resolve().parent
+    scripts_dir = _scripts_dir_for_precommit()
 
     hook_entry = f"""
 # --- progressive-context hooks ---
@@ -171,111 +275,166 @@ def install_precommit(git_root: Path) -> None:
     print("  Run: pre-commit install --hook-type post-commit --hook-type post-merge")
 
 
+def _scripts_dir_for_precommit() -> Path:
+    """Directory holding the context scripts referenced by hook entries."""
+    return Path(__file__).resolve().parent
+
+
+def _context_hook_entries() -> list:
+    """Hook definitions for the local pre-commit repo entry."""
+    scripts_dir = _scripts_dir_for_precommit()
+    return [
+        {
+            "id": "context-check-watches",
+            "name": "Check context freshness",
+            "entry": f"python3 {scripts_dir}/context_check_watches.py",
+            "language": "system",
+            "stages": ["post-commit"],
+            "always_run": True,
+        },
+        {
+            "id": "context-audit",
+            "name": "Context audit (post-merge)",
+            "entry": f"python3 {scripts_dir}/context_audit.py",
+            "language": "system",
+            "stages": ["post-merge"],
+            "always_run": True,
+        },
+    ]
+
+
+def _install_precommit_structured(config_path: Path, content: str) -> None:
+    """Append the local hooks repo by mutating the parsed YAML tree.
+
+    One parse plus one write, and the entry lands inside the repos list
+    regardless of how the file indents it — the textual append only
+    works for column-zero list items.
+    """
+    yaml = YAML()
+    data = yaml.load(content) or {}
+    data.setdefault("repos", []).append({
+        "repo": "local",
+        "hooks": _context_hook_entries(),
+    })
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.dump(data, f)
+
+    print("  Added local hooks to .pre-commit-config.yaml")
+    print("  Run: pre-commit install --hook-type post-commit --hook-type post-merge")
+
+
 def install_plain_git(git_root: Path) -> None:
     """Install hooks via plain .githooks/ directory."""
     print("Detected: plain git hooks")
     hooks_dir = git_root / ".githooks"
     hooks_dir.mkdir(exist_ok=True)
+    snapshot = _snapshot_dir(hooks_dir) or {}
 
     wrote_any = False
     wrote_any |= write_hook(hooks_dir / "post-commit",
                             HOOK_CONTENT["post-commit"],
-                            ".githooks/post-commit")
+                            ".githooks/post-commit", snapshot)
     wrote_any |= write_hook(hooks_dir / "post-merge",
                             HOOK_CONTENT["post-merge"],
-                            ".githooks/post-merge")
+                            ".githooks/post-merge", snapshot)
 
-    # Configure git to use .githooks
-    try:
-        result = subprocess.run(
-            ["git", "config", "core.hooksPath"],
-            capture_output=True, text=True, check=False,
-            cwd=git_root,
-        )
-        current_path = result.stdout.strip()
-        if current_path != ".githooks":
+    # Configure git to use .githooks; only fork the write when the
+    # current value (from the single --list read) needs changing.
+    if _read_local_git_config(git_root).get("core.hookspath") != ".githooks":
+        try:
             subprocess.run(
                 ["git", "config", "core.hooksPath", ".githooks"],
-                check=True, cwd=git_root,
+                check=True, cwd=os.fspath(git_root),
             )
             print("  Set git config core.hooksPath = .githooks")
-        else:
-            print("  core.hooksPath already set to .githooks")
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(f"  Warning: could not set core.hooksPath: {e}", file=sys.stderr)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"  Warning: could not set core.hooksPath: {e}", file=sys.stderr)
+    else:
+        print("  core.hooksPath already set to .githooks")
 
 
 CONTEXT_HOOK_MARKER = "progressive-context"
 CONTEXT_HOOK_SIGNATURES = ("context_check_watches", "context_audit")
 
-
-def _remove_hook_file(hook_path: Path, hook_name: str) -> bool:
+# Compiled once: line classification in _remove_hook_file runs these per
+# line, and a single alternation scan beats chained substring tests.
+# Byte patterns: _remove_hook_file scans raw bytes, skipping the
+# decode/encode round-trip on files it only partially rewrites.
+_SIG_RE = re.compile(rb"context_check_watches|context_audit")
+_OURS_RE = re.compile(
+    rb"context_check_watches|context_audit|progressive-context"
+    rb"|SCRIPTS_DIR=|command -v python3|xargs.*python3|git diff-tree"
+)
+_SCAFFOLD_RE = re.compile(rb"^\s*(?:if|fi|then|else|elif|done|do);?\s*$")
+_MARKER_BYTES = CONTEXT_HOOK_MARKER.encode("ascii")
+
+
+def _remove_hook_file(hook_path: Path, hook_name: str,
+                      snapshot: dict | None = None) -> bool:
     """Remove a hook file or clean progressive-context lines from it.
 
     If the entire file is a progressive-context hook, delete it.
     If progressive-context was appended to an existing hook, remove only that section.
-    Returns True if something was removed.
+    Returns True if something was removed.  snapshot, when given, must
+    cover hook_path's directory (see _snapshot_dir) and replaces the
+    existence stat with a dict lookup.
     """
-    if not hook_path.exists():
+    if snapshot is not None:
+        if hook_path.name not in snapshot:
+            return False
+    elif not hook_path.exists():
         return False
 
-    content = hook_path.read_text(encoding="utf-8")
+    data = hook_path.read_bytes()
 
     # Check if this file contains our hooks at all
-    if not any(sig in content for sig in CONTEXT_HOOK_SIGNATURES):
+    if not _SIG_RE.search(data):
         return False
 
     # Determine if the file is entirely ours or has other meaningful content.
     # "Ours" = empty, shebang, comments, shell scaffolding (if/fi/then/else),
     # variable assignments for SCRIPTS_DIR, and lines with context-hook signatures.
-    SHELL_SCAFFOLDING = {"if", "fi", "then", "else", "elif", "done", "do"}
-
-    def _is_ours(line: str) -> bool:
+    def _is_ours(line: bytes) -> bool:
         s = line.strip()
-        if not s or s.startswith("#") or line.startswith("#!/"):
-            return True
-        if any(sig in line for sig in CONTEXT_HOOK_SIGNATURES):
-            return True
-        if CONTEXT_HOOK_MARKER in line:
+        if not s or s.startswith(b"#") or line.startswith(b"#!/"):
             return True
-        if "SCRIPTS_DIR=" in line or "command -v python3" in line:
-            return True
-        if "xargs" in line and "python3" in line:
-            return True
-        if "git diff-tree" in line:
-            return True
-        if s.rstrip(";") in SHELL_SCAFFOLDING:
-            return True
-        return False
-
-    foreign_lines = [l for l in content.splitlines() if not _is_ours(l)]
-
-    if not foreign_lines:
-        hook_path.unlink()
-        print(f"  Removed {hook_name}")
-        return True
-
-    # Other content exists — remove our marker-delimited section and any
-    # standalone context-hook lines, keeping everything else.
-    cleaned = []
+        return bool(_OURS_RE.search(line)) or bool(_SCAFFOLD_RE.match(line))
+
+    # Single streaming pass: classify each line once, collecting the
+    # cleaned output (marker-delimited section and standalone context
+    # lines dropped, everything else copied byte-for-byte via keepends)
+    # while tracking whether any foreign content exists at all.
+    out = bytearray()
+    has_foreign = False
     skip_block = False
-    for line in content.splitlines():
-        if CONTEXT_HOOK_MARKER in line:
+    for line in data.splitlines(keepends=True):
+        if _MARKER_BYTES in line:
             skip_block = True
             continue
         if skip_block:
-            if any(sig in line for sig in CONTEXT_HOOK_SIGNATURES):
+            if _SIG_RE.search(line):
                 continue
             if not line.strip():
                 continue
             skip_block = False
-        if _is_ours(line) and not line.startswith("#!/"):
-            # Only drop non-shebang "ours" lines if they're isolated
-            # (surrounded by other ours lines). Keep if adjacent to foreign.
+        if _is_ours(line):
+            # Keep only the shebang among "ours" lines; the rest are
+            # comments, scaffolding, or context-hook invocations.
+            if line.startswith(b"#!/"):
+                out.extend(line)
             continue
-        cleaned.append(line)
+        has_foreign = True
+        out.extend(line)
+
+    if not has_foreign:
+        # The file is entirely ours — no point rewriting it.
+        hook_path.unlink()
+        print(f"  Removed {hook_name}")
+        return True
 
-    hook_path.write_text("\n".join(cleaned) + "\n", encoding="utf-8")
+    if out and not out.endswith(b"\n"):
+        out.extend(b"\n")
+    hook_path.write_bytes(bytes(out))
     print(f"  Cleaned context hooks from {hook_name}")
     return True
 
@@ -294,85 +453,121 @@ def uninstall_precommit(git_root: Path) -> None:
     config_path = git_root / ".pre-commit-config.yaml"
     if not config_path.exists():
         return
-    content = config_path.read_text(encoding="utf-8")
-    if CONTEXT_HOOK_MARKER not in content:
+    data = config_path.read_bytes()
+
+    # Fast reject on raw bytes: when neither a context hook id nor the
+    # marker appears anywhere, skip the decode and YAML parse outright.
+    if b"context-" not in data and _MARKER_BYTES not in data:
         print("  No context hooks found in .pre-commit-config.yaml")
         return
 
-    # Remove the block from the marker to the end of our entries
-    lines = content.splitlines()
-    cleaned = []
-    skip = False
-    for line in lines:
-        if CONTEXT_HOOK_MARKER in line:
-            skip = True
-            continue
-        if skip:
-            # Skip until we hit a line that starts a new repo block or EOF
-            stripped = line.strip()
-            if stripped.startswith("- repo:") and "local" not in stripped:
-                skip = False
-                cleaned.append(line)
-            continue
-        cleaned.append(line)
+    if YAML is not None:
+        _uninstall_precommit_structured(config_path, data.decode("utf-8"))
+        return
 
-    config_path.write_text("\n".join(cleaned) + "\n", encoding="utf-8")
+    # The textual install appends one contiguous block from the marker
+    # header to EOF, so removal is a find plus a truncating slice — no
+    # line walk, and no repo-block heuristics that could misfire on a
+    # user's own local repo below ours.
+    idx = data.find(b"# --- progressive-context hooks ---")
+    if idx == -1:
+        print("  No context hooks found in .pre-commit-config.yaml")
+        return
+    config_path.write_bytes(data[:idx].rstrip() + b"\n")
     print("  Removed context hooks from .pre-commit-config.yaml")
 
 
+def _is_context_repo(repo) -> bool:
+    """True for the local repo entry holding our context-* hooks."""
+    return (isinstance(repo, dict) and repo.get("repo") == "local"
+            and any(isinstance(h, dict) and str(h.get("id", "")).startswith("context-")
+                    for h in repo.get("hooks", [])))
+
+
+def _uninstall_precommit_structured(config_path: Path, content: str) -> None:
+    """Drop our local hooks repo from the parsed YAML tree.
+
+    Matches on hook ids rather than the textual marker, so it cannot
+    misdelete a user's own local repo or trip on a comment that happens
+    to mention the marker.
+    """
+    yaml = YAML()
+    data = yaml.load(content)
+    repos = (data or {}).get("repos") or []
+    kept = [r for r in repos if not _is_context_repo(r)]
+    if len(kept) == len(repos):
+        print("  No context hooks found in .pre-commit-config.yaml")
+        return
+    data["repos"] = kept
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.dump(data, f)
+    print("  Removed context hooks from .pre-commit-config.yaml")
+
+
+def _unset_local_hookspath(git_root: Path) -> None:
+    """Drop core.hooksPath from the repo-local config.
+
+    Always forks `git config --unset`: git config is multi-valued
+    (duplicate keys such as several remote.*.fetch refspecs are legal),
+    which configparser-style rewrites collapse, so an in-process edit
+    risks corrupting the user's config to save one fork on a path that
+    runs once per uninstall.
+    """
+    try:
+        subprocess.run(
+            ["git", "config", "--unset", "core.hooksPath"],
+            check=False, cwd=os.fspath(git_root), capture_output=True,
+        )
+        print("  Unset git config core.hooksPath")
+    except FileNotFoundError:
+        pass
+
+
 def uninstall_plain_git(git_root: Path) -> None:
     """Remove context hooks from .githooks/ directory."""
     print("Detected: plain git hooks")
     hooks_dir = git_root / ".githooks"
     removed_any = False
-    if hooks_dir.is_dir():
+    snapshot = _snapshot_dir(hooks_dir)
+    if snapshot is not None:
         removed_any |= _remove_hook_file(hooks_dir / "post-commit",
-                                          ".githooks/post-commit")
+                                          ".githooks/post-commit", snapshot)
         removed_any |= _remove_hook_file(hooks_dir / "post-merge",
-                                          ".githooks/post-merge")
+                                          ".githooks/post-merge", snapshot)
         # If directory is now empty, remove it and reset hooksPath
         remaining = list(hooks_dir.iterdir())
         if not remaining:
             hooks_dir.rmdir()
             print("  Removed empty .githooks/ directory")
-            try:
-                subprocess.run(
-                    ["git", "config", "--unset", "core.hooksPath"],
-                    check=False, cwd=git_root, capture_output=True,
-                )
-                print("  Unset git config core.hooksPath")
-            except FileNotFoundError:
-                pass
+            _unset_local_hookspath(git_root)
 
 
 def main():
-    root_arg = None
-    uninstall = False
-    args = sys.argv[1:]
-    if "--uninstall" in args:
-        uninstall = True
-        args.remove("--uninstall")
-    if "--root" in args:
-        idx = args.index("--root")
-        if idx + 1 < len(args):
-            root_arg = args[idx + 1]
-
-    git_root = find_git_root(root_arg or ".")
-
-    if uninstall:
+    parser = argparse.ArgumentParser(
+        description="Install or uninstall context freshness git hooks")
+    parser.add_argument("--uninstall", action="store_true",
+                        help="remove previously installed context hooks")
+    parser.add_argument("--root", default=".",
+                        help="directory to resolve the git root from")
+    args = parser.parse_args()
+
+    git_root = find_git_root(args.root)
+    snapshot = _top_level_snapshot(git_root)
+
+    if args.uninstall:
         print(f"Uninstalling context hooks from: {git_root}\n")
-        if detect_husky(git_root):
+        if detect_husky(git_root, snapshot):
             uninstall_husky(git_root)
-        elif detect_precommit(git_root):
+        elif detect_precommit(git_root, snapshot):
             uninstall_precommit(git_root)
         else:
             uninstall_plain_git(git_root)
         print("\nDone. Context hooks removed.")
     else:
         print(f"Installing context hooks in: {git_root}\n")
-        if detect_husky(git_root):
+        if detect_husky(git_root, snapshot):
             install_husky(git_root)
-        elif detect_precommit(git_root):
+        elif detect_precommit(git_root, snapshot):
             install_precommit(git_root)
         else:
             install_plain_git(git_root)